@@ -1,6 +1,6 @@
 from .cenyslovensko_scraper import FoodScraper
-from .database import Database
+from .database import Database, BatchWriter
 from .config import CATEGORIES, TEST_CATEGORIES
 from .notifier import Notifier
 
-__all__ = ['FoodScraper', 'Database', 'Notifier', CATEGORIES, TEST_CATEGORIES]
\ No newline at end of file
+__all__ = ['FoodScraper', 'Database', 'BatchWriter', 'Notifier', CATEGORIES, TEST_CATEGORIES]
\ No newline at end of file
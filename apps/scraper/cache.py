@@ -0,0 +1,68 @@
+import os
+import time
+from datetime import date, datetime
+import pickle
+import sqlite3
+
+CACHE_PATH = '.cache/urls.db'
+
+class UrlCache:
+    '''
+    SQLite cache of scraped products keyed by product URL, so re-runs skip fresh products.
+    Only products scraped today are reused, prices are saved under today's date and must come from today.
+    '''
+
+    def __init__(self, path=CACHE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        # No fsync per put, with WAL a committed row still survives the process crashing
+        self.conn.execute('PRAGMA synchronous = NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, scraped_at INTEGER, payload BLOB)'
+        )
+
+        # Earlier days are never reused, drop them so the file doesn't grow run after run
+        self.conn.execute('DELETE FROM urls WHERE scraped_at < ?', (self.today_start(),))
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def get_fresh(self, urls):
+        '''
+        Returns cached products scraped today for the given URLs
+        '''
+
+        wanted = set(urls)
+        cutoff = self.today_start()
+        rows = self.conn.execute('SELECT url, payload FROM urls WHERE scraped_at >= ?', (cutoff,))
+        return {url: pickle.loads(payload) for url, payload in rows if url in wanted}
+
+    def put(self, url, product_retailers):
+        '''
+        Store a freshly scraped product, committed right away so a crashed run keeps it
+        '''
+
+        self.conn.execute(
+            'INSERT OR REPLACE INTO urls (url, scraped_at, payload) VALUES (?, ?, ?)',
+            (url, int(time.time()), pickle.dumps(product_retailers))
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def today_start():
+        '''
+        Unix time of local midnight, the same calendar day the database stamps prices with
+        '''
+
+        return int(datetime.combine(date.today(), datetime.min.time()).timestamp())
+
+    def close(self):
+        self.conn.close()
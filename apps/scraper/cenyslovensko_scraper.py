@@ -1,24 +1,81 @@
 import asyncio
-from playwright.async_api import async_playwright, Page, Browser, Locator
+import aiohttp
+from contextlib import asynccontextmanager, AsyncExitStack
+from playwright.async_api import async_playwright, Page, Browser, BrowserContext, Route
 from tqdm.asyncio import tqdm
-import random
+import time
 import re
+import traceback
 import json
-from datetime import datetime
-from typing import Optional, Any
-from collections import Counter
+import os
+from html import unescape
+from datetime import datetime, date
+from typing import Optional, Any, AsyncIterator, Awaitable, Callable
 from .config import TEST_CATEGORIES, CATEGORIES
+from .cache import UrlCache
 
 TIMEOUT_SELECTOR = 10000
-SLEEP_MIN = 1.0
-SLEEP_MAX = 1.5
+RETRY_TIMEOUT_SELECTOR = 20000
+REQUESTS_PER_SECOND = 8
 RETRY_ATTEMPTS = 5
 WORKERS_MAX = 10
 WORKERS_MIN = 5
+PAGE_MAX_USES = 50
+COOKIE_CLEAR_USES = 500
+LISTING_WORKERS = 4
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+HTTP_HEADERS = {
+    'User-Agent': USER_AGENT,
+    'Accept': 'text/html,application/xhtml+xml',
+    'Accept-Language': 'sk-SK,sk;q=0.9'
+}
+
+# Retries come from a different browser profile, so a fingerprint the site soured on doesn't fail twice
+RETRY_USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+RETRY_HTTP_HEADERS = {
+    'Accept-Language': 'sk,en-US;q=0.8,en;q=0.6'
+}
+
+BROWSER_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--dns-prefetch-disable',
+
+    # Strip subsystems a scraper never uses, fewer helper processes and lower RSS
+    '--disable-features=site-per-process,IsolateOrigins,TranslateUI,BlinkGenPropertyTrees',
+    '--disable-background-networking',
+    '--disable-background-timer-throttling',
+    '--disable-renderer-backgrounding',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-extensions',
+    '--disable-component-update',
+    '--disable-default-apps',
+    '--mute-audio',
+    '--no-first-run',
+    '--no-zygote',
+    '--js-flags=--max-old-space-size=512'
+]
+
+# Resources the scraper never reads, aborted before they hit the network
+BLOCKED_RESOURCES = {'image', 'media', 'font', 'stylesheet'}
+BLOCKED_URLS = re.compile(r'googletagmanager|google-analytics|doubleclick|hotjar|facebook')
+
+# Compiled once, used for every listing page and product
+PAGE_RE = re.compile(r'Stránka (\d+)')
+CURRENT_PAGE_RE = re.compile(r'currentPage=\d+')
+LISTING_HREF_RE = re.compile(r'href="(/detail/[^"]+)"')
+DATE_RE = re.compile(r'(\d{2})\.(\d{2})\.(\d{4})')
+# Drops nbsp and euro sign in one pass, the decimal comma is only swapped once the unit is split off
+PRICE_TRANSLATE = str.maketrans({'\xa0': None, '€': None})
+PRICE_FIELDS = ('price_with_vat', 'price_without_vat', 'unit_price')
 
 SELECTORS = {
     # Category page selectors
-    'product_image': 'img[alt^="Obrázok produktu"]',  
+    'product_link': 'a[href^="/detail/"]',  
     'pagination_button': 'button[aria-label^="Stránka"]',  
     
     # Product detail page selectors
@@ -35,147 +92,405 @@ SELECTORS = {
     'retailer_logo': 'img[alt]',
 }
 
+# Product detail labels to retailer_data keys
+LABEL_MAP = {
+    'Veľkosť balenia': 'package_size',
+    'DPH': 'vat_rate',
+    'Krajina pôvodu': 'country_of_origin',
+    'Výrobca': 'producer',
+    'Distribútor': 'distributor'
+}
+MULTI_PARAGRAPH_LABELS = {'Krajina pôvodu', 'Výrobca', 'Distribútor'}
+
+# Only the selectors the extraction script reads, serialized to the browser per product
+RETAILER_SELECTORS = {
+    key: SELECTORS[key] for key in (
+        'retailer_button', 'product_name', 'product_details', 'price_with_vat',
+        'price_without_vat', 'unit_price', 'discount_info', 'retailer_logo'
+    )
+}
+
+# Runs in the page against the accordion container and returns every retailer at once.
+# Panels are expanded one by one (the accordion keeps a single item open) and awaited
+# in the browser, so the whole product costs one round-trip instead of one per field.
+RETAILER_EXTRACT_JS = '''
+async (container, sel) => {
+    const text = (root, selector) => root?.querySelector(selector)?.textContent.trim() ?? null;
+    const panelFor = (button) => document.getElementById(button.getAttribute('aria-controls'));
+
+    // Navigation resolves on commit, so the list may still be parsing. Wait until the DOM is
+    // parsed and the number of retailers stays the same across two checks.
+    let count = -1;
+    for (let i = 0; i < 80; i++) {
+        const current = container.querySelectorAll(sel.retailer_button).length;
+        if (current > 0 && current === count && document.readyState !== 'loading') {
+            break;
+        }
+        count = current;
+        await new Promise(resolve => setTimeout(resolve, 25));
+    }
+    const buttons = [...container.querySelectorAll(sel.retailer_button)];
+    const retailers = [];
+
+    for (const button of buttons) {
+        // Single retailer is already expanded by default
+        if (buttons.length > 1 && button.getAttribute('aria-expanded') !== 'true') {
+            button.click();
+        }
+        for (let i = 0; i < 100 && !panelFor(button)?.querySelector(sel.product_details); i++) {
+            await new Promise(resolve => setTimeout(resolve, 20));
+        }
+
+        const panel = panelFor(button);
+        const details = [...(panel?.querySelector(sel.product_details)?.querySelectorAll('dt') ?? [])].map(dt => [
+            text(dt, 'strong'),
+            [...dt.parentElement.querySelectorAll('dd p')].map(p => p.textContent),
+        ]);
+
+        retailers.push({
+            retailer: button.querySelector(sel.retailer_logo)?.getAttribute('alt') ?? null,
+            price_with_vat: text(button, sel.price_with_vat),
+            price_without_vat: text(button, sel.price_without_vat),
+            unit_price: text(button, sel.unit_price),
+            discount_info: text(button, sel.discount_info),
+            product_name: text(panel, sel.product_name),
+            details: details,
+        });
+    }
+
+    return retailers;
+}
+'''
+
+def tee(
+    write: Callable[[list[dict[str, Any]]], Any],
+    sink: Callable[[list[dict[str, Any]]], Awaitable[None]]
+) -> Callable[[list[dict[str, Any]]], Awaitable[None]]:
+    '''
+    Wrap an on_success callback so every product is handed to write before reaching sink.
+    '''
+
+    async def on_success(product_data: list[dict[str, Any]]):
+        write(product_data)
+        await sink(product_data)
+    return on_success
+
+class RateLimiter():
+    '''
+    Token bucket shared by all workers. Requests go out back to back while tokens last,
+    waiting only once the bucket is empty, so the overall rate stays polite.
+    '''
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        '''
+        Take one token, sleeping until the bucket refills if needed.
+        '''
+
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class PagePool():
+    '''
+    Bounded pool of reusable pages sharing one browser context.
+    The queue size caps concurrency, pages are recycled after max_uses navigations.
+    A slot whose page could not be replaced goes back empty and gets a new page on next borrow.
+    '''
+
+    def __init__(self, context: BrowserContext, size: int, max_uses: int = PAGE_MAX_USES, reset: bool = True):
+        self.context = context
+        self.size = size
+        self.max_uses = max_uses
+        self.reset = reset
+        self.releases = 0
+        self.queue: asyncio.Queue[tuple[Optional[Page], int]] = asyncio.Queue(maxsize=size)
+
+    async def __aenter__(self):
+        for _ in range(self.size):
+            self.queue.put_nowait((await self.context.new_page(), 0))
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        while not self.queue.empty():
+            page, _ = self.queue.get_nowait()
+            if page:
+                await page.close()
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Page]:
+        '''
+        Borrow a page from the pool, blocks until one is free.
+        '''
+
+        page, uses = await self.queue.get()
+        if page is None:
+            try:
+                page = await self.context.new_page()
+            except BaseException:
+                # Context is gone, hand the slot back so others fail fast instead of waiting forever
+                self.queue.put_nowait((None, 0))
+                raise
+
+        try:
+            yield page
+        finally:
+            slot = (None, 0)
+            try:
+                slot = await self._release(page, uses + 1)
+            except Exception:
+                # Release failed part way, close the page so the slot doesn't leave a renderer behind
+                try:
+                    if not page.is_closed():
+                        await page.close()
+                except Exception:
+                    pass
+            finally:
+                self.queue.put_nowait(slot)
+
+    async def _release(self, page: Page, uses: int) -> tuple[Page, int]:
+        '''
+        Reset page for next borrower or replace it once it has been used up.
+        '''
+
+        # Cookies are shared by the whole context, so they are dropped periodically
+        # rather than per page to avoid pulling them from under pages in flight
+        self.releases += 1
+        if self.reset and self.releases % COOKIE_CLEAR_USES == 0:
+            await self.context.clear_cookies()
+
+        if uses < self.max_uses and not page.is_closed():
+            if not self.reset:
+                return page, uses
+            try:
+                await page.goto('about:blank')
+                return page, uses
+            except Exception:
+                pass
+
+        if not page.is_closed():
+            await page.close()
+        return await self.context.new_page(), 0
+
 class FoodScraper():
     '''
     Food scraper for cenyslovensko.sk which scrapes prices, labels, sources etc.
     '''
 
-    def __init__(self, cats: list[str], headless: bool):
+    def __init__(
+        self, 
+        cats: list[str], 
+        headless: bool, 
+        verbose: bool = False, 
+        cache: Optional[UrlCache] = None, 
+        output_dir: Optional[str] = None
+    ):
         self.cats = cats
         self.headless = headless
+        self.verbose = verbose
+        self.cache = cache
+        self.output_dir = output_dir
+
+        # Replaces the fixed per-product sleep, same ceiling as 10 workers sleeping ~1.25 s
+        self.rate_limiter = RateLimiter(REQUESTS_PER_SECOND, WORKERS_MAX)
+
+        # Listing pages are tried over plain HTTP first, switched off once they turn out to need JS
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.http_listing = True
 
-    async def scrape_urls(self, page: Page, base_url: str) -> Optional[list[str]]:
+    async def scrape_urls(self, pool: PagePool, base_url: str) -> Optional[list[list[str]]]:
         '''
         Returns all individual product URLs for given category.
+        Listing pages are fetched concurrently on pages borrowed from the pool.
         '''
         
         try:
             parts = base_url.rstrip('/').split('/')
             cat = parts[-1]
 
-            product_urls = []
-
-            # Find page count
-            pagination_count = await page.locator(SELECTORS['pagination_button']).count()
-            if pagination_count == 0:
-                return None
-
-            last_button = page.locator(SELECTORS['pagination_button']).nth(-1)
-            aria_label = await last_button.get_attribute('aria-label')
-                
-            match = re.search(r'Stránka (\d+)', aria_label)
-            if match:
-                total_pages = int(match.group(1))
-            else:
+            first_page = await self.read_first_page(pool, base_url)
+            if first_page is None:
                 return None
+            total_pages, first_hrefs = first_page
             
-            # Collect product URLs from pages
-            for page_num in range(1, total_pages + 1):
+            # Build listing URLs of the remaining pages, they are independent so can be fetched in parallel
+            page_urls = []
+            for page_num in range(2, total_pages + 1):
                 if 'currentPage=' in base_url:
-                    url = re.sub(r'currentPage=\d+', f'currentPage={page_num}', base_url)
+                    url = CURRENT_PAGE_RE.sub(f'currentPage={page_num}', base_url)
                 else:
                     separator = '&' if '?' in base_url else '?'
                     url = f'{base_url}{separator}currentPage={page_num}'
-                
-                await page.goto(url, wait_until='commit')
-                await page.wait_for_selector(SELECTORS['product_image'], state='attached', timeout=10000)
-
-                product_images = await page.locator(SELECTORS['product_image']).all()
-
-                # Extract href from each product
-                for img in product_images:
-                    product_card = img.locator('xpath=..').first
-                    link = product_card.locator('a[href^="/detail/"]').first
-                    href = await link.get_attribute('href')
-                                    
-                    if href:
-                        if href.startswith('http'):
-                            product_urls.append([href, cat])
-                        else:
-                            base = 'https://cenyslovensko.sk'
-                            product_urls.append([f'{base}{href}', cat])
+                page_urls.append(url)
+
+            # Small cap per category to stay below the site's rate limits
+            semaphore = asyncio.Semaphore(LISTING_WORKERS)
+            results = await asyncio.gather(
+                *[self.fetch_page_urls(pool, url, semaphore) for url in page_urls],
+                return_exceptions=True
+            )
+
+            for url, hrefs in zip(page_urls, results):
+                if isinstance(hrefs, Exception):
+                    print(f'❌ Error scraping URLs from {url}: {hrefs}')
+                    return None
+
+            # A card can link to its detail more than once, dict keeps first-seen order
+            hrefs = dict.fromkeys(href for page_hrefs in [first_hrefs, *results] for href in page_hrefs if href)
+            base = 'https://cenyslovensko.sk'
+            product_urls = [[href if href.startswith('http') else f'{base}{href}', cat] for href in hrefs]
 
             return product_urls
             
         except Exception as e:
             print(f'❌ Error scraping URLs from {base_url}: {e}')
             return None 
-        
-    async def extract_product_data(self, page: Page, product_url: list[str]) -> list[dict[str, Any]]:
+
+    async def read_first_page(self, pool: PagePool, base_url: str) -> Optional[tuple[int, list[str]]]:
         '''
-        Extract detailed data from individual product page
+        Returns number of listing pages of a category and the product hrefs of its first page,
+        so page 1 is only loaded once. Read from plain HTML when possible.
         '''
 
-        async def get_text(locator: Locator, selector: str) -> str:
-            return (await locator.locator(selector).first.text_content()).strip()
+        html = await self.fetch_listing_html(base_url)
+        if html:
+            page_numbers = PAGE_RE.findall(html)
+            hrefs = LISTING_HREF_RE.findall(html)
+            if page_numbers and hrefs:
+                return max(int(num) for num in page_numbers), [unescape(href) for href in hrefs]
+
+            # Listing is rendered client-side, use the browser from now on
+            self.http_listing = False
+
+        async with pool.acquire() as page:
+            await page.goto(base_url, wait_until='commit', timeout=60000)
+
+            # Pagination comes after the product grid, once it is attached the whole grid is there too
+            await page.wait_for_selector(SELECTORS['product_link'], state='attached', timeout=60000)
+            await page.wait_for_selector(SELECTORS['pagination_button'], state='attached', timeout=60000)
+
+            # Find page count, label of the last pagination button read in one round trip
+            aria_label = await page.eval_on_selector_all(
+                SELECTORS['pagination_button'],
+                'els => els.length ? els[els.length - 1].getAttribute("aria-label") : null'
+            )
+            if not aria_label:
+                return None
+
+            hrefs = await page.eval_on_selector_all(
+                SELECTORS['product_link'],
+                'els => els.map(el => el.getAttribute("href"))'
+            )
+                
+        match = PAGE_RE.search(aria_label)
+        return (int(match.group(1)), hrefs) if match else None
+
+    async def fetch_page_urls(self, pool: PagePool, url: str, semaphore: asyncio.Semaphore) -> list[str]:
+        '''
+        Returns raw product hrefs of a single listing page.
+        '''
+
+        async with semaphore:
+            html = await self.fetch_listing_html(url)
+            if html:
+                hrefs = LISTING_HREF_RE.findall(html)
+                if hrefs:
+                    return [unescape(href) for href in hrefs]
+
+                # Product cards are rendered client-side, use the browser from now on
+                self.http_listing = False
+
+            async with pool.acquire() as page:
+                await page.goto(url, wait_until='commit')
+                await page.wait_for_selector(SELECTORS['product_link'], state='attached', timeout=10000)
+                await page.wait_for_selector(SELECTORS['pagination_button'], state='attached', timeout=10000)
+
+                return await page.eval_on_selector_all(
+                    SELECTORS['product_link'],
+                    'els => els.map(el => el.getAttribute("href"))'
+                )
+
+    async def fetch_listing_html(self, url: str) -> Optional[str]:
+        '''
+        Fetch a listing page without the browser, None when plain HTTP can't be used.
+        '''
+
+        if not self.http_listing or self.session is None:
+            return None
+
+        try:
+            async with self.session.get(url) as response:
+                if response.status != 200:
+                    return None
+                return await response.text()
+        except Exception as e:
+            print(f'⚠️  Plain HTTP listing failed for {url}: {e}')
+            return None
         
-        all_retailer_data = []
+    async def extract_product_data(self, page: Page, product_url: list[str]) -> list[dict[str, Any]]:
+        '''
+        Extract detailed data from individual product page in a single browser round-trip
+        '''
 
-        # Find all retailer buttons (accordion items)
-        retailer_buttons = await page.locator(SELECTORS['accordion_container']).first.locator(SELECTORS['retailer_button']).all()
+        container = page.locator(SELECTORS['accordion_container']).first
+        retailers = await container.evaluate(RETAILER_EXTRACT_JS, RETAILER_SELECTORS)
 
-        field_mapping = {
-            'Veľkosť balenia': 'package_size',
-            'DPH': 'vat_rate',
-            'Krajina pôvodu': 'country_of_origin',
-            'Výrobca': 'producer',
-            'Distribútor': 'distributor'
-        }
+        all_retailer_data = []
 
-        for idx, button in enumerate(retailer_buttons):
+        for idx, raw in enumerate(retailers):
             try:
                 retailer_data = {}
                 
-                # Extract data from collapsed button (always visible)
-                retailer_data['retailer'] = await button.locator(SELECTORS['retailer_logo']).first.get_attribute('alt')
-                retailer_data['price_with_vat'] = await get_text(button, SELECTORS['price_with_vat'])
-                retailer_data['price_without_vat'] = await get_text(button, SELECTORS['price_without_vat'])
-                retailer_data['unit_price'] = await get_text(button, SELECTORS['unit_price'])
-                retailer_data['discount_end_date'] = await get_text(button, SELECTORS['discount_info'])
+                # Data from collapsed button (always visible)
+                retailer_data['retailer'] = raw['retailer']
+                retailer_data['price_with_vat'] = raw['price_with_vat']
+                retailer_data['price_without_vat'] = raw['price_without_vat']
+                retailer_data['unit_price'] = raw['unit_price']
+                retailer_data['discount_end_date'] = raw['discount_info']
                 retailer_data['product_url'] = product_url[0]
                 retailer_data['category'] = product_url[1]
-                
-                # Single retailer is already expanded by default
-                if len(retailer_buttons) > 1:
-                    await button.evaluate('element => element.click()')
-
-                panel_id = await button.get_attribute('aria-controls')    
-                panel = page.locator(f'#{panel_id}').first
 
                 if idx == 0:
-                    main_product_name = await get_text(panel, SELECTORS['product_name'])
+                    main_product_name = raw['product_name']
                 retailer_data['product_name'] = main_product_name
 
-                # Get all dt elements (labels)
-                dt_elements = await panel.locator(SELECTORS['product_details']).first.locator('dt').all()
-                
-                for dt_elem in dt_elements:
-                    label = await get_text(dt_elem, 'strong')
-                    
-                    if label not in field_mapping:
+                # Label -> paragraph texts pairs read from the expanded panel
+                for label, texts in raw['details']:
+                    key = LABEL_MAP.get(label)
+                    if key is None:
                         continue
                     
                     # Extract value (with special handling for multi-paragraph fields)
-                    parent_div = dt_elem.locator('..').first
-                    if label in ['Krajina pôvodu', 'Výrobca', 'Distribútor']:
-                        dd_elems = await parent_div.locator('dd p').all()
-                        texts = [await elem.text_content() for elem in dd_elems]
+                    if label in MULTI_PARAGRAPH_LABELS:
                         value = '; '.join(texts)
                         
                         if label == 'Krajina pôvodu':
                             value = 'slovakia' if 'slovensko' in value.lower() else 'foreign'
                     else:
-                        value = await get_text(parent_div, 'dd p')
+                        value = texts[0].strip()
                     
                     # Single assignment using the mapping
-                    retailer_data[field_mapping[label]] = value
+                    retailer_data[key] = value
 
                 retailer_data = self.clean_product_data(retailer_data)
                 all_retailer_data.append(retailer_data)
 
             except Exception as e:
                 print(f'Error extracting retailer {idx}: {e}')
-                import traceback
                 traceback.print_exc()
                 continue
         
@@ -188,175 +503,297 @@ class FoodScraper():
 
         cleaned = raw_data.copy()
         
-        for field in ['price_with_vat', 'price_without_vat', 'unit_price']:
-            if field in cleaned and cleaned[field]:
-                price_str = cleaned[field].replace('\xa0', '').replace('€', '').replace('(bez DPH)', '').strip()
+        for field in PRICE_FIELDS:
+            if cleaned.get(field):
+                price_str = cleaned[field].translate(PRICE_TRANSLATE)
+
+                # Cut suffixes by index instead of building intermediate strings,
+                # float() ignores the surrounding whitespace on its own
+                cut = price_str.find('(bez DPH)')
+                if cut != -1:
+                    price_str = price_str[:cut]
                 
-                if field == 'unit_price' and '/' in price_str:
-                    unit_part = price_str.split('/')[1].strip()
-                    cleaned['unit'] = unit_part
-                    price_str = price_str.split('/')[0].strip() 
+                if field == 'unit_price':
+                    price_str, slash, unit_part = price_str.partition('/')
+                    if slash:
+                        cleaned['unit'] = unit_part.partition('/')[0].strip()
+
+                # Unit text keeps its own commas, e.g. '1,5 l'
+                price_str = price_str.replace(',', '.')
                 
-                if '–' in price_str or '-' in price_str:
-                    separator = '–' if '–' in price_str else '-'
-                    parts = price_str.split(separator)
-                    cleaned[f'{field}_min'] = float(parts[0].replace(',', '.').strip())
-                    cleaned[f'{field}_max'] = float(parts[1].replace(',', '.').strip())
+                separator = '–' if '–' in price_str else '-' if '-' in price_str else None
+                if separator:
+                    low, _, high = price_str.partition(separator)
+                    cleaned[f'{field}_min'] = float(low)
+                    cleaned[f'{field}_max'] = float(high)
                     cleaned[field] = None  
                 else:
-                    price = price_str.replace(',', '.')
-                    cleaned[field] = float(price) if price else None
+                    cleaned[field] = float(price_str) if price_str.strip() else None
         
-        if 'vat_rate' in cleaned and cleaned['vat_rate']:
+        if cleaned.get('vat_rate'):
             cleaned['vat_rate'] = float(cleaned['vat_rate'].replace('%', '').strip())
         
-        if 'discount_end_date' in cleaned and cleaned['discount_end_date']:
-            if cleaned['discount_end_date'] == '– –':
-                cleaned['discount_end_date'] = None
-            else:
-                match = re.search(r'(\d{2}\.\d{2}\.\d{4})', cleaned['discount_end_date'])
-                if match:
-                    date_str = match.group(1)
-                    from datetime import datetime
-                    cleaned['discount_end_date'] = datetime.strptime(date_str, '%d.%m.%Y').date()
-                else:
-                    cleaned['discount_end_date'] = None
+        if cleaned.get('discount_end_date'):
+            # No discount is shown as '– –', which the date pattern never matches
+            match = DATE_RE.search(cleaned['discount_end_date'])
+            cleaned['discount_end_date'] = date(int(match[3]), int(match[2]), int(match[1])) if match else None
         
         return cleaned
     
-    async def scrape_product(
+    def new_session(self) -> aiohttp.ClientSession:
+        '''
+        Create the HTTP session shared by every plain-HTTP request of a run.
+        Connections to the site are kept alive and reused instead of reconnecting per page.
+        '''
+
+        connector = aiohttp.TCPConnector(
+            limit_per_host=WORKERS_MAX,
+            keepalive_timeout=30,
+            ttl_dns_cache=300
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            headers=HTTP_HEADERS,
+            timeout=aiohttp.ClientTimeout(total=30)
+        )
+
+    async def new_context(
         self, 
         browser: Browser, 
-        url: list[str], 
-        semaphore: asyncio.Semaphore
+        user_agent: str = USER_AGENT, 
+        headers: Optional[dict[str, str]] = None
+    ) -> BrowserContext:
+        '''
+        Create a browser context with the given user agent and resource blocking.
+        '''
+
+        context = await browser.new_context(
+            user_agent=user_agent,
+            extra_http_headers=headers,
+            viewport={'width': 1920, 'height': 1080}
+        )
+        await context.route('**/*', self.block_resources)
+        return context
+
+    async def block_resources(self, route: Route):
+        '''
+        Abort requests for images, fonts, media, styles and trackers.
+        '''
+
+        request = route.request
+        if request.resource_type in BLOCKED_RESOURCES or BLOCKED_URLS.search(request.url):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def scrape_product(
+        self, 
+        pool: PagePool, 
+        url: list[str],
+        timeout: int = TIMEOUT_SELECTOR
     ) -> tuple[bool, Optional[list[dict[str, Any]]], list[str]]: 
         '''
-        Scrape a single product with semaphore control.
+        Scrape a single product on a page borrowed from the pool.
         Returns tuple: (success: bool, data: list or None, url: tuple)
         '''
 
-        async with semaphore:
-            await asyncio.sleep(random.uniform(SLEEP_MIN, SLEEP_MAX))
-            page = await browser.new_page()
+        async with pool.acquire() as page:
+            await self.rate_limiter.acquire()
             try:
-                await page.goto(url[0], wait_until='domcontentloaded')
-                await page.wait_for_selector(SELECTORS['accordion_container'], state='attached', timeout=TIMEOUT_SELECTOR)
+                await page.goto(url[0], wait_until='commit')
+                await page.wait_for_selector(SELECTORS['retailer_button'], state='attached', timeout=timeout)
                 product_data = await self.extract_product_data(page, url)
                 return (True, product_data, url)
             except Exception as e:
                 return (False, None, url)
-            finally:
-                await page.close()
     
     async def scrape_batch(
         self, 
-        browser: Browser, 
-        urls: list[list[str]], 
-        semaphore: asyncio.Semaphore
-    ) -> tuple[list[list[dict[str, Any]]], list[list[str]]]:  
+        pool: PagePool, 
+        urls: list[list[str]],
+        on_success: Callable[[list[dict[str, Any]]], Awaitable[None]],
+        timeout: int = TIMEOUT_SELECTOR
+    ) -> tuple[int, list[list[str]]]:  
         '''
-        Scrape a batch of URLs and return successful/failed lists.
+        Scrape a batch of URLs, handing each product to on_success as soon as it completes.
         
         Returns:
-            tuple: (successful_products, failed_urls)
+            tuple: (successful_count, failed_urls)
         '''
 
-        tasks = [self.scrape_product(browser, url, semaphore) for url in urls]
+        # Fixed set of workers pulls from a URL queue, only pool.size scrapes exist at any time
+        pending: asyncio.Queue[list[str]] = asyncio.Queue()
+        for url in urls:
+            pending.put_nowait(url)
+        results: asyncio.Queue[tuple[bool, Optional[list[dict[str, Any]]], list[str]]] = asyncio.Queue()
+
+        async def worker():
+            while not pending.empty():
+                url = pending.get_nowait()
+                try:
+                    result = await self.scrape_product(pool, url, timeout)
+                except Exception:
+                    result = (False, None, url)
+                results.put_nowait(result)
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(pool.size, len(urls)))]
         
-        successful_products = []
+        successful_count = 0
         failed_urls = []
+
+        # Full progress bar only when watched, cron runs get a line every ~1%
+        progress = tqdm(total=len(urls), desc='Scraping', unit='product', mininterval=0.5) if self.verbose else None
+        report_every = max(1, len(urls) // 100)
         
-        for coro in tqdm.as_completed(tasks, total=len(urls), desc='Scraping', unit='product'):
-            success, product_data, url = await coro
-            if success and product_data:
-                successful_products.append(product_data)
-            else:
-                failed_urls.append(url)
+        try:
+            for done in range(1, len(urls) + 1):
+                success, product_data, url = await results.get()
+                if success and product_data:
+                    await on_success(product_data)
+                    successful_count += 1
+                else:
+                    failed_urls.append(url)
+
+                if progress is not None:
+                    progress.update()
+                elif done % report_every == 0 or done == len(urls):
+                    print(f'Scraping: {done}/{len(urls)} products', end='\r', flush=True)
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            if progress is not None:
+                progress.close()
+
+        if not self.verbose:
+            print()
         
-        return successful_products, failed_urls
+        return successful_count, failed_urls
     
-    async def scrape_page(self, custom_urls=None) -> list[list[dict[str, Any]]]:
+    async def discover_cat(self, pool: PagePool, cat: str, max_attempts: int = 3) -> Optional[list[list[str]]]:
+        '''
+        Collect product URLs of one category, retrying with exponential backoff.
+        '''
+
+        print(f'Accessing {cat}...')
+
+        for attempt in range(1, max_attempts + 1):
+            urls = await self.scrape_urls(pool, cat)
+            if urls:
+                return urls
+
+            if attempt < max_attempts:
+                await asyncio.sleep(3 * 2 ** (attempt - 1))
+
+        return None
+
+    async def scrape_page(
+        self,
+        custom_urls=None,
+        on_success: Optional[Callable[[list[dict[str, Any]]], Awaitable[None]]] = None
+    ) -> tuple[list[list[dict[str, Any]]], float]:
         '''
-        Main async scraping orchestrator with retry logic
+        Main async scraping orchestrator with retry logic.
+        Products are streamed to on_success when given, otherwise collected and returned.
         '''
 
-        async with async_playwright() as p:
+        all_products = []
+        if on_success is None:
+            async def on_success(product_data):
+                all_products.append(product_data)
+
+        # Exit stack closes the local output file however the run ends
+        async with AsyncExitStack() as stack, async_playwright() as p:
+            # Save locally just in case, one JSON line per product as it arrives so a crash keeps what was scraped.
+            # Opened before anything is scraped so a bad directory fails right away.
+            output = None
+            if self.output_dir:
+                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                json_filename = os.path.join(self.output_dir, f'scraped_data_{timestamp}.jsonl')
+                output = stack.enter_context(open(json_filename, 'w', encoding='utf-8', buffering=1))
+
             browser = await p.chromium.launch(
                 headless=self.headless,
-                args=[
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-dev-shm-usage',
-                    '--disable-gpu',
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox',
-                    '--dns-prefetch-disable'
-                ]
+                args=BROWSER_ARGS
             )
-            context = await browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                viewport={'width': 1920, 'height': 1080}
-            )
-            page = await context.new_page()
 
             print('🔍 Discovering pages...')
             if custom_urls is None:
-                all_urls = []
-
-                # Fetch all product urls for all cats
-                for cat in self.cats:
-                    print(f'Accessing {cat}...')
-                    
-                    page = await context.new_page()
-                    
-                    max_attempts = 3
-                    for attempt in range(1, max_attempts + 1):
-                        await page.goto(cat, wait_until='domcontentloaded', timeout=60000)
-                        await page.wait_for_selector(SELECTORS['product_image'], state='attached', timeout=10000)
-                        
-                        urls = await self.scrape_urls(page, cat)
-                        
-                        if urls:
-                            all_urls.extend(urls)
-                            break
-                        else:
-                            if attempt < max_attempts:
-                                await asyncio.sleep(3)
-                    
-                    await page.close()
-                    
-                    if not urls:
-                        print(f'🛑 Stopping scraper - cannot continue without all categories')
-                        await browser.close()
-                        return []
+                # Fetch all product urls for all cats concurrently, gather keeps category order.
+                # Listing pages are public and every borrower navigates straight away, so pages
+                # go back to the pool as they are, retries included.
+                async with (
+                    self.new_session() as session,
+                    await self.new_context(browser) as context,
+                    PagePool(context, WORKERS_MAX, reset=False) as pool
+                ):
+                    self.session = session
+                    results = await asyncio.gather(*[self.discover_cat(pool, cat) for cat in self.cats])
+                    self.session = None
+
+                if not all(results):
+                    print(f'🛑 Stopping scraper - cannot continue without all categories')
+                    await browser.close()
+                    raise RuntimeError('Product discovery failed for some categories')
+
+                all_urls = [url for urls in results for url in urls]
             else:
                 all_urls = custom_urls
 
-            await page.close()
+            # Single pass dedup, a product keeps the first category it was found in
+            seen = {}
+            for url, cat in all_urls:
+                seen.setdefault(url, cat)
 
-            url_counts = Counter([url[0] for url in all_urls])
-            duplicates = {url: count for url, count in url_counts.items() if count > 1}
+            duplicates = len(all_urls) - len(seen)
             if duplicates:
-                print(f'⚠️  {len(duplicates)} products appear in multiple categories')
-                seen = set()
-                all_urls = [url for url in all_urls if url[0] not in seen and not seen.add(url[0])]
+                print(f'⚠️  {duplicates} duplicate product URLs across categories')
+                all_urls = [[url, cat] for url, cat in seen.items()]
                 print(f'✅ Deduplicated to {len(all_urls)} unique products')
 
-            print(f'✅ Total product pages to scrape: {len(all_urls)}')
+            if output:
+                on_success = tee(
+                    lambda product_data: output.write(json.dumps(product_data, ensure_ascii=False, default=str) + '\n'),
+                    on_success
+                )
 
             # Retry config
             attempt = 1
             urls_to_scrape = all_urls
-            all_products = []
+            scraped_count = 0
+
+            # Products already scraped today are emitted without opening them again
+            if self.cache:
+                cached = self.cache.get_fresh(url for url, _ in all_urls)
+                for product_data in cached.values():
+                    await on_success(product_data)
+                scraped_count += len(cached)
+                urls_to_scrape = [url for url in all_urls if url[0] not in cached]
+                print(f'💾 {len(cached)} products loaded from cache')
+
+                on_success = tee(
+                    lambda product_data: self.cache.put(product_data[0]['product_url'], product_data),
+                    on_success
+                )
+
+            print(f'✅ Total product pages to scrape: {len(urls_to_scrape)}')
 
             while urls_to_scrape and attempt <= RETRY_ATTEMPTS:
                 print(f'\n🔄 Attempt {attempt}/{RETRY_ATTEMPTS} - Processing {len(urls_to_scrape)} URLs')
                 
-                concurrency = WORKERS_MAX if attempt == 1 else WORKERS_MIN
-                semaphore = asyncio.Semaphore(concurrency)
+                # Retries run slower, with a different profile and more patience per page
+                if attempt == 1:
+                    concurrency, timeout = WORKERS_MAX, TIMEOUT_SELECTOR
+                    context_args = {}
+                else:
+                    concurrency, timeout = WORKERS_MIN, RETRY_TIMEOUT_SELECTOR
+                    context_args = {'user_agent': RETRY_USER_AGENT, 'headers': RETRY_HTTP_HEADERS}
                 
-                # Scrape batch
-                successful, failed = await self.scrape_batch(browser, urls_to_scrape, semaphore)
-                all_products.extend(successful)
+                # Scrape batch, pool size bounds the number of pages in flight.
+                # Every attempt gets a fresh context so cookies, cache and storage don't carry over.
+                async with await self.new_context(browser, **context_args) as context, PagePool(context, concurrency) as pool:
+                    successful, failed = await self.scrape_batch(pool, urls_to_scrape, on_success, timeout)
+                scraped_count += successful
                                 
                 # Check for failures
                 if failed:
@@ -380,18 +817,14 @@ class FoodScraper():
             
             await browser.close()
 
-            # Save locally just in case
-            # timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            # json_filename = f'scraped_data_{timestamp}.json'
-            # with open(json_filename, 'w', encoding='utf-8') as f:
-            #     json.dump(all_products, f, ensure_ascii=False, indent=2, default=str)
-            # print(f'💾 Saved to {json_filename}')
+            if output:
+                print(f'💾 Saved to {json_filename}')
             
             print(f'\n📊 Final Results:')
-            print(f'Total products scraped: {len(all_products)}')
-            print(f'Success rate: {len(all_products)}/{len(all_urls)} ({len(all_products)/len(all_urls)*100:.1f}%)')
+            print(f'Total products scraped: {scraped_count}')
+            print(f'Success rate: {scraped_count}/{len(all_urls)} ({scraped_count/len(all_urls)*100:.1f}%)')
             
-            return all_products, len(all_products)/len(all_urls)
+            return all_products, scraped_count/len(all_urls)
                         
 if __name__ == '__main__':
     scraper = FoodScraper(TEST_CATEGORIES, True)
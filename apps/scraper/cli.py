@@ -2,8 +2,16 @@ import click
 import asyncio
 from .config import CATEGORIES
 from .cenyslovensko_scraper import FoodScraper
-from .database import Database
+from .database import Database, BatchWriter
 from .notifier import Notifier
+from .cache import UrlCache
+
+# libuv loop for the socket-heavy scrape when available, stock asyncio otherwise
+try:
+    import uvloop
+    LOOP_FACTORY = uvloop.new_event_loop
+except ImportError:
+    LOOP_FACTORY = None
 
 def delimit(message, number):
     print(f'\n\n### {number}. {message}')
@@ -17,41 +25,58 @@ def cli():
     pass
 
 @cli.command()
-def scrape():
+@click.option('--verbose', is_flag=True, help='Show a live progress bar while scraping')
+@click.option('--cache', 'cache_path', default=None, help='SQLite file caching products scraped today, re-runs on the same day skip them')
+@click.option('--output', 'output_dir', default=None, type=click.Path(file_okay=False, exists=True), help='Directory to also write scraped products to as JSON lines')
+def scrape(verbose, cache_path, output_dir):
     '''
     Scrape prices from cenyslovensko.sk and save to database
     '''
     
-    notifier = Notifier()
-    notifier.send_message('📤 <b>Notification</b>\n\nStarting cron job!')
+    async def run():
+        cache = UrlCache(cache_path) if cache_path else None
 
-    try:
-        delimit('Scraping products', 1)
-        
-        # Scrape data
-        scraper = FoodScraper(CATEGORIES, headless=True)
-        all_products, success_rate = asyncio.run(scraper.scrape_page())
-        
-        delimit('Saving to DB', 2)
+        async with Notifier() as notifier:
+            # Start message goes out while the browser launches
+            started = asyncio.create_task(notifier.send_message('📤 <b>Notification</b>\n\nStarting cron job!'))
 
-        # Save to database
-        async def save_data():
-            async with Database() as db:
-                total_saved = await db.save_scraped_data(all_products)
-                return total_saved
-        
-        total_saved = asyncio.run(save_data())
-        click.echo(f'✅ Saved {total_saved} price records to database')
+            try:
+                delimit('Scraping products', 1)
+                
+                # Scrape data
+                scraper = FoodScraper(CATEGORIES, headless=True, verbose=verbose, cache=cache, output_dir=output_dir)
 
-        if success_rate == 1.0:
-            notifier.send_success(len(all_products))
-        else:
-            notifier.send_partial_success(len(all_products), success_rate)
+                # Save to database in batches while scraping continues
+                async with Database() as db:
+                    writer = BatchWriter(db)
+                    try:
+                        _, success_rate = await scraper.scrape_page(on_success=writer.add)
+                        
+                        delimit('Saving to DB', 2)
+                        total_saved = await writer.close()
+                    finally:
+                        # On failure, stop saves still in flight before the pool closes under them
+                        unsaved = await writer.abort()
+                        if unsaved:
+                            click.echo(f'⚠️  {unsaved} scraped products were not saved to database')
+                click.echo(f'✅ Saved {total_saved} price records to database')
 
-    except Exception as e:
-        click.echo(f'❌ Error: {e}')
-        notifier.send_failure(str(e))
-        raise
+                if success_rate == 1.0:
+                    await notifier.send_success(writer.products)
+                else:
+                    await notifier.send_partial_success(writer.products, success_rate)
+
+            except Exception as e:
+                click.echo(f'❌ Error: {e}')
+                await notifier.send_failure(str(e))
+                raise
+
+            finally:
+                await started
+                if cache:
+                    cache.close()
+
+    asyncio.run(run(), loop_factory=LOOP_FACTORY)
 
 @cli.command()
 def validate():
@@ -86,7 +111,12 @@ def test_telegram():
         return
     
     click.echo('📤 Sending test notification...')
-    success = notifier.send_message('🧪 <b>Test notification</b>\n\nYour food scraper Telegram bot is working!')
+
+    async def send():
+        async with notifier:
+            return await notifier.send_message('🧪 <b>Test notification</b>\n\nYour food scraper Telegram bot is working!')
+
+    success = asyncio.run(send())
     
     if success:
         click.echo('✅ Test notification sent! Check your Telegram.')
@@ -1,31 +1,79 @@
 import os
-from psycopg import AsyncConnection
+import asyncio
 from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
 from datetime import date
 from dotenv import load_dotenv
 
 load_dotenv()
 
+SAVE_BATCH_SIZE = 500
+POOL_MIN_SIZE = 1
+POOL_MAX_SIZE = 4
+
+RETAILER_NAMES = {
+    'lidl': 'Lidl',
+    'kaufland': 'Kaufland',
+    'tesco': 'Tesco',
+    'billa': 'Billa',
+    'fresh plus': 'Fresh Plus',
+    'terno': 'Terno'
+}
+
+# Columns of a price row, in the order rows are built and copied
+PRICE_FIELDS = (
+    'price_with_vat', 'price_without_vat', 'unit_price', 'unit',
+    'price_with_vat_min', 'price_without_vat_min', 'unit_price_min',
+    'price_with_vat_max', 'price_without_vat_max', 'unit_price_max',
+    'vat_rate', 'discount_end_date'
+)
+PRICE_COLUMNS = ('product_id', 'retailer_id', *PRICE_FIELDS, 'date')
+PRICE_COLUMNS_SQL = ', '.join(PRICE_COLUMNS)
+
+# Staging types follow the Python values so binary COPY needs no conversion,
+# the merge into prices casts them to the real column types
+PRICE_STAGE_TYPES = (
+    'int8', 'int8',
+    'float8', 'float8', 'float8', 'text',
+    'float8', 'float8', 'float8',
+    'float8', 'float8', 'float8',
+    'float8', 'date',
+    'date'
+)
+PRICE_STAGE_SQL = ', '.join(f'{column} {column_type}' for column, column_type in zip(PRICE_COLUMNS, PRICE_STAGE_TYPES))
+
 class Database:
     '''
-    PostgreSQL database connection and operations
+    PostgreSQL connection pool and operations
     '''
 
     def __init__(self):
         self.connection_string = os.getenv('DATABASE_URL')
         if not self.connection_string:
             raise ValueError('DATABASE_URL not found in .env file')
-        self.conn = None
+        self.pool = None
+        self.retailer_ids = {}
 
     async def __aenter__(self):
         '''
         Async context manager entry
         '''
 
-        self.conn = await AsyncConnection.connect(
+        self.pool = AsyncConnectionPool(
             self.connection_string,
-            row_factory=dict_row
+            min_size=POOL_MIN_SIZE,
+            max_size=POOL_MAX_SIZE,
+            kwargs={'row_factory': dict_row},
+            open=False
         )
+        await self.pool.open(wait=True)
+
+        # Retailers are a handful of static rows, look them up once
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute('SELECT id, name FROM retailers')
+                self.retailer_ids = {row['name']: row['id'] for row in await cur.fetchall()}
+
         print('✅ Database connected')
         return self
 
@@ -34,50 +82,85 @@ class Database:
         Async context manager exit
         '''
 
-        if self.conn:
-            await self.conn.close()
+        if self.pool:
+            await self.pool.close()
             print('Database connection closed')
 
-    async def get_retailer_id(self, retailer_name):
+    def get_retailer_id(self, retailer_name):
         '''
         Get retailer ID by name (case-insensitive)
         '''
 
-        retailer_map = {
-            'lidl': 'Lidl',
-            'kaufland': 'Kaufland',
-            'tesco': 'Tesco',
-            'billa': 'Billa',
-            'fresh plus': 'Fresh Plus',
-            'terno': 'Terno'
-        }
-        
-        normalized_name = retailer_map.get(retailer_name.lower())
+        normalized_name = RETAILER_NAMES.get(retailer_name.lower())
         if not normalized_name:
             raise ValueError(f'Retailer "{retailer_name}" not recognized')
-        
-        async with self.conn.cursor() as cur:
+
+        retailer_id = self.retailer_ids.get(normalized_name)
+        if retailer_id is None:
+            raise ValueError(f'Retailer "{normalized_name}" not found in database')
+        return retailer_id
+
+    async def lookup_products_by_url(self, conn, urls):
+        '''
+        Find ids of already known products in one query. Returns dict of product_url -> product_id.
+        '''
+
+        async with conn.cursor() as cur:
             await cur.execute(
-                'SELECT id FROM retailers WHERE name = %s',
-                (normalized_name,)
+                'SELECT id, product_url FROM products WHERE product_url = ANY(%s)',
+                (urls,),
+                prepare=True
             )
-            result = await cur.fetchone()
-            if result:
-                return result['id']
-            else:
-                raise ValueError(f'Retailer "{normalized_name}" not found in database')
+            return {row['product_url']: row['id'] for row in await cur.fetchall()}
 
-    async def get_or_create_product(self, product_data):
+    async def bulk_upsert_products(self, conn, products):
         '''
-        Get existing product or create new one. Returns product_id.
-        Handles race conditions with ON CONFLICT.
+        Touch last_seen of known products in one statement and create the new ones in one pipeline.
+        Product info is taken from the first retailer. Returns dict of product_url -> product_id.
         '''
-        product_url = product_data['product_url']
-        
-        async with self.conn.cursor() as cur:
-            try:
-                # Atomic insert-or-update using ON CONFLICT
+
+        if not products:
+            return {}
+
+        rows = [
+            (
+                product[0]['product_url'],
+                product[0].get('product_name'),
+                product[0].get('category', 'unknown'),
+                product[0].get('package_size'),
+                product[0].get('country_of_origin'),
+                product[0].get('producer'),
+                product[0].get('distributor')
+            )
+            for product in products
+        ]
+
+        # Most products were already seen on earlier days, only the rest need inserting
+        product_ids = await self.lookup_products_by_url(conn, [row[0] for row in rows])
+        new_rows = [row for row in rows if row[0] not in product_ids]
+
+        async with conn.cursor() as cur:
+            if product_ids:
                 await cur.execute(
+                    'UPDATE products SET last_seen = CURRENT_TIMESTAMP WHERE id = ANY(%s)',
+                    (list(product_ids.values()),),
+                    prepare=True
+                )
+
+        if new_rows:
+            product_ids.update(await self.insert_products(conn, new_rows))
+        return product_ids
+
+    async def insert_products(self, conn, rows):
+        '''
+        Insert new products in one pipeline. Returns dict of product_url -> product_id.
+        '''
+
+        # executemany prepares the statement by itself after a few rows
+        async with conn.cursor() as cur:
+            async with conn.pipeline():
+                # Atomic insert-or-update using ON CONFLICT, handles race conditions
+                await cur.executemany(
                     '''
                     INSERT INTO products 
                     (product_url, name, category, package_size, country_of_origin, 
@@ -87,35 +170,44 @@ class Database:
                     DO UPDATE SET last_seen = CURRENT_TIMESTAMP
                     RETURNING id
                     ''',
-                    (
-                        product_url,
-                        product_data.get('product_name'),
-                        product_data.get('category'),
-                        product_data.get('package_size'),
-                        product_data.get('country_of_origin'),
-                        product_data.get('producer'),
-                        product_data.get('distributor')
-                    )
+                    rows,
+                    returning=True
                 )
-                await self.conn.commit()
-                product_id = (await cur.fetchone())['id']
-                return product_id
-            except Exception as e:
-                print(product_data)
-                raise
-
-    async def insert_price(self, product_id, retailer_id, price_data, scrape_date):
-        '''Insert or update price record.'''
-        async with self.conn.cursor() as cur:
+
+            # One result set per row, in the order the rows were sent
+            product_ids = {}
+            for row in rows:
+                product_ids[row[0]] = (await cur.fetchone())['id']
+                cur.nextset()
+
+        return product_ids
+
+    async def bulk_insert_prices(self, conn, rows):
+        '''
+        Insert or update many price records at once.
+        Rows are streamed with COPY into a staging table and merged into prices in one statement.
+        Returns number of rows written.
+        '''
+
+        if not rows:
+            return 0
+
+        async with conn.cursor() as cur:
             await cur.execute(
-                '''
-                INSERT INTO prices 
-                (product_id, retailer_id, 
-                 price_with_vat, price_without_vat, unit_price, unit,
-                 price_with_vat_min, price_without_vat_min, unit_price_min,
-                 price_with_vat_max, price_without_vat_max, unit_price_max,
-                 vat_rate, discount_end_date, date)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                f'CREATE TEMP TABLE prices_stage ({PRICE_STAGE_SQL}) ON COMMIT DROP'
+            )
+
+            async with cur.copy(f'COPY prices_stage ({PRICE_COLUMNS_SQL}) FROM STDIN WITH (FORMAT BINARY)') as copy:
+                copy.set_types(PRICE_STAGE_TYPES)
+                for row in rows:
+                    await copy.write_row(row)
+
+            # A single INSERT can't update the same row twice, keep one record per key
+            await cur.execute(
+                f'''
+                INSERT INTO prices ({PRICE_COLUMNS_SQL})
+                SELECT DISTINCT ON (product_id, retailer_id, date) {PRICE_COLUMNS_SQL}
+                FROM prices_stage
                 ON CONFLICT (product_id, retailer_id, date) 
                 DO UPDATE SET
                     price_with_vat = EXCLUDED.price_with_vat,
@@ -131,66 +223,125 @@ class Database:
                     vat_rate = EXCLUDED.vat_rate,
                     discount_end_date = EXCLUDED.discount_end_date,
                     created_at = CURRENT_TIMESTAMP
-                ''',
-                (
-                    product_id, retailer_id,
-                    price_data.get('price_with_vat'),
-                    price_data.get('price_without_vat'),
-                    price_data.get('unit_price'),
-                    price_data.get('unit'),
-                    price_data.get('price_with_vat_min'),
-                    price_data.get('price_without_vat_min'),
-                    price_data.get('unit_price_min'),
-                    price_data.get('price_with_vat_max'),
-                    price_data.get('price_without_vat_max'),
-                    price_data.get('unit_price_max'),
-                    price_data.get('vat_rate'),
-                    price_data.get('discount_end_date'),
-                    scrape_date
-                )
+                '''
             )
-            await self.conn.commit()
+            saved_count = cur.rowcount
+
+        return saved_count
 
-    async def save_product(self, retailer_data_list, category):
+    def price_rows(self, products, product_ids, scrape_date):
         '''
-        Save one product with all its retailer prices.
-        Returns number of prices saved.
+        Build price rows of all retailers of all products, ready for bulk_insert_prices.
         '''
-        scrape_date = date.today()
-        
-        if not retailer_data_list:
-            return 0
-        
-        # Get product info from first retailer
-        first_retailer = retailer_data_list[0].copy()
-        first_retailer['category'] = category
-        
-        # Get or create product
-        product_id = await self.get_or_create_product(first_retailer)
-        
-        # Save price for each retailer
-        saved_count = 0
-        for retailer_data in retailer_data_list:
-            try:
-                retailer_id = await self.get_retailer_id(retailer_data['retailer'])
-                await self.insert_price(product_id, retailer_id, retailer_data, scrape_date)
-                saved_count += 1
-            except Exception as e:
-                print(f'❌ Error saving price for {retailer_data.get('retailer')}: {e}')
-                continue
+
+        rows = []
+        errors = {}
+        # A batch names the same few retailers thousands of times, resolve each name once
+        retailer_ids = {}
+        for product_retailers in products:
+            product_id = product_ids[product_retailers[0]['product_url']]
+            for retailer_data in product_retailers:
+                try:
+                    retailer_name = retailer_data['retailer']
+                    retailer_id = retailer_ids.get(retailer_name)
+                    if retailer_id is None:
+                        retailer_id = retailer_ids[retailer_name] = self.get_retailer_id(retailer_name)
+                    rows.append((
+                        product_id, retailer_id,
+                        *(retailer_data.get(field) for field in PRICE_FIELDS),
+                        scrape_date
+                    ))
+                except Exception as e:
+                    errors[str(e)] = errors.get(str(e), 0) + 1
+                    continue
+
+        # One line per distinct problem instead of one per skipped row
+        for error, count in errors.items():
+            print(f'❌ Error saving {count} prices: {error}')
         
-        return saved_count
+        return rows
 
     async def save_scraped_data(self, all_products):
-        from tqdm import tqdm
+        scrape_date = date.today()
+        products = [product_retailers for product_retailers in all_products if product_retailers]
+        print(f'💾 Saving {len(products)} products to database...')
 
-        print('💾 Saving to database...')
+        # Whole batch on one pooled connection in a single transaction, other batches can be saved on the rest.
+        # A failed batch rolls back on its own, batches already saved stay.
+        async with self.pool.connection() as conn, conn.transaction():
+            # Don't wait for the WAL flush on commit. A server crash can lose today's last few batches for good,
+            # prices are keyed by date so only a repeated run on the same day (e.g. with --cache) writes them again.
+            await conn.execute('SET LOCAL synchronous_commit = off')
+
+            product_ids = await self.bulk_upsert_products(conn, products)
+
+            price_rows = self.price_rows(products, product_ids, scrape_date)
+            return await self.bulk_insert_prices(conn, price_rows)
+
+class BatchWriter:
+    '''
+    Buffers scraped products and saves them in batches while scraping continues
+    '''
+
+    def __init__(self, db, batch_size=SAVE_BATCH_SIZE, max_pending=POOL_MAX_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.batch = []
+        self.pending = set()
+        self.products = 0
+        self.saved_products = 0
+        self.total_saved = 0
+
+    async def add(self, product_retailers):
+        '''
+        Buffer one product, flushing once the batch is full
+        '''
+
+        self.batch.append(product_retailers)
+        self.products += 1
+        if len(self.batch) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        '''
+        Start saving the buffered batch in the background.
+        Saves run side by side on the pool, waits for one to finish once max_pending are in flight.
+        '''
+
+        while len(self.pending) >= self.max_pending:
+            done, self.pending = await asyncio.wait(self.pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+
+        batch, self.batch = self.batch, []
+        if batch:
+            self.pending.add(asyncio.create_task(self._save(batch)))
+
+    async def close(self):
+        '''
+        Save whatever is left and return number of prices saved
+        '''
+
+        await self.flush()
+        await asyncio.gather(*self.pending)
+        self.pending = set()
+        return self.total_saved
+
+    async def abort(self):
+        '''
+        Cancel saves still in flight after a failed run and drop the buffer.
+        Returns number of scraped products that were not saved.
+        '''
 
-        total_saved = 0
-        for product_retailers in tqdm(all_products, desc='Saving', unit='product'):
-            if product_retailers:
-                category = product_retailers[0].get('category', 'unknown')
-                saved_count = await self.save_product(product_retailers, category)
-                total_saved += saved_count
+        for task in self.pending:
+            task.cancel()
+        await asyncio.gather(*self.pending, return_exceptions=True)
+        self.pending = set()
+        self.batch = []
+        return self.products - self.saved_products
 
-        return total_saved
\ No newline at end of file
+    async def _save(self, batch):
+        saved_count = await self.db.save_scraped_data(batch)
+        self.total_saved += saved_count
+        self.saved_products += len(batch)
@@ -1,10 +1,13 @@
 import os
-import requests
+import aiohttp
 from datetime import datetime
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Telegram HTML parse mode only needs these three escaped
+HTML_ESCAPE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;'})
+
 class Notifier:
     '''
     Send notifications to Telegram bot
@@ -19,16 +22,45 @@ class Notifier:
             self.enabled = False
         else:
             self.enabled = True
+
+        # Keep-alive session so later messages skip the TCP/TLS handshake,
+        # created lazily because it must live on the running event loop
+        self._session = None
+        self._url = f'https://api.telegram.org/bot{self.bot_token}/sendMessage'
+
+    async def __aenter__(self):
+        '''
+        Async context manager entry
+        '''
+
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        '''
+        Async context manager exit
+        '''
+
+        await self.close()
+
+    async def close(self):
+        '''
+        Close the HTTP session if one was opened
+        '''
+
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
     
-    def send_message(self, message, parse_mode='HTML'):
+    async def send_message(self, message, parse_mode='HTML'):
         '''
         Send a message to Telegram
         '''
 
         if not self.enabled:
             return False
-        
-        url = f'https://api.telegram.org/bot{self.bot_token}/sendMessage'
+
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
         
         payload = {
             'chat_id': self.chat_id,
@@ -37,13 +69,13 @@ class Notifier:
         }
         
         try:
-            response = requests.post(url, json=payload, timeout=10)
-            return response.status_code == 200
+            async with self._session.post(self._url, json=payload) as response:
+                return response.status == 200
         except Exception as e:
             print(f'❌ Failed to send Telegram notification: {e}')
             return False
     
-    def send_success(self, products_count):
+    async def send_success(self, products_count):
         '''
         Send success notification
         '''
@@ -56,16 +88,16 @@ class Notifier:
             f'📦 Products: {products_count}'
         )
         
-        return self.send_message(message)
+        return await self.send_message(message)
 
-    def send_failure(self, error_message):
+    async def send_failure(self, error_message):
         '''
         Send failure notification
         '''
 
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        error_message = error_message.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+        error_message = error_message.translate(HTML_ESCAPE)
         
         message = (
             f'❌ <b>Food Scraper Failed</b>\n'
@@ -73,9 +105,9 @@ class Notifier:
             f'⚠️ Error: <code>{error_message}</code>'
         )
         
-        return self.send_message(message)
+        return await self.send_message(message)
     
-    def send_partial_success(self, products_count, success_rate):
+    async def send_partial_success(self, products_count, success_rate):
         '''
         Send partial success notification (some failures but completed)
         '''
@@ -89,4 +121,4 @@ class Notifier:
             f'✓ Success rate: {success_rate:.1%}'
         )
         
-        return self.send_message(message)
\ No newline at end of file
+        return await self.send_message(message)
\ No newline at end of file